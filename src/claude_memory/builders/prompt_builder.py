@@ -150,18 +150,19 @@ class PromptBuilder:
                 type_header = f"\n## {self._get_type_header(unit_type)}\n\n"
                 content_parts.append(type_header)
                 current_tokens += self.token_counter.count_tokens(type_header)
-            
+
             # 限制每种类型的片段数
             units_to_add = units[:self.config.max_fragments_per_type]
-            
-            for unit in units_to_add:
-                unit_content = self._format_unit(unit)
-                unit_tokens = self.token_counter.count_tokens(unit_content)
-                
+
+            # 一次性批量统计token，避免逐条encode
+            unit_contents = [self._format_unit(unit) for unit in units_to_add]
+            unit_token_counts = self.token_counter.count_tokens_batch(unit_contents)
+
+            for unit_content, unit_tokens in zip(unit_contents, unit_token_counts):
                 # 检查token限制
                 if max_tokens and current_tokens + unit_tokens > max_tokens:
                     break
-                
+
                 content_parts.append(unit_content)
                 current_tokens += unit_tokens
                 fragment_count += 1
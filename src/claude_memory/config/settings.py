@@ -150,6 +150,10 @@ class PerformanceSettings(BaseSettings):
     embedding_cache_size: int = Field(default=1000, ge=10, le=10000)
     response_cache_size: int = Field(default=500, ge=10, le=5000)
     
+    # HTTP连接池（模型API调用共享一个带keep-alive的会话）
+    http_max_connections: int = Field(default=100, ge=1, le=1000)
+    http_max_connections_per_host: int = Field(default=20, ge=1, le=200)
+
     # 数据库连接池
     db_pool_size: int = Field(default=10, ge=1, le=50)
     db_max_overflow: int = Field(default=20, ge=0, le=100)
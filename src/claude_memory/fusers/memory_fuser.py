@@ -7,28 +7,47 @@ Claude记忆管理MCP服务 - MemoryFuser模块
 from __future__ import annotations
 
 import asyncio
-import hashlib
-import json
+import functools
+import threading
 from pathlib import Path
+from string import Formatter
 from typing import Any, Dict, List, Optional, Tuple
 
 import structlog
-from pydantic import BaseModel, Field
+import xxhash
+from cachetools import TTLCache
+from pydantic import BaseModel, ConfigDict, Field
 
-from ..models.data_models import MemoryUnitModel
+from ..models.data_models import MemoryUnitModel, MemoryUnitType
 from ..utils.model_manager import ModelManager
-# from ..utils.cost_tracker import CostTracker  # Module not found
+from ..utils.cost_tracker import CostTracker
+from ..utils.serialization import dumps_json
 from ..utils.token_counter import TokenCounter
 
 logger = structlog.get_logger()
 
 
+@functools.lru_cache(maxsize=256)
+def _fragment_tags(index: int) -> Tuple[str, str]:
+    """片段编号标签（编号空间有限，记忆化后为字典查找）"""
+    return f"<fragment_{index:02d}>", f"</fragment_{index:02d}>"
+
+
+# 类型行取值空间固定，预先生成
+_TYPE_LINES: Dict[MemoryUnitType, str] = {
+    unit_type: f"Type: {unit_type.value}\n" for unit_type in MemoryUnitType
+}
+
+
 class FusionConfig(BaseModel):
     """融合配置"""
-    
+
+    # 配置在初始化后不可变，实例间可安全共享
+    model_config = ConfigDict(frozen=True)
+
     enabled: bool = Field(default=True, description="是否启用融合")
     model: str = Field(default="gemini-2.5-flash", description="融合模型")
-    temperature: float = Field(default=0.2, description="生成温度")
+    temperature: float = Field(default=0.2, ge=0.0, le=1.0, description="生成温度")
     prompt_template_path: str = Field(
         default="./prompts/MiniLLM_Memory_Prompt_Template_v3.md",
         description="提示模板路径"
@@ -37,11 +56,20 @@ class FusionConfig(BaseModel):
     language: str = Field(default="zh", description="输出语言")
     cache_enabled: bool = Field(default=True, description="是否启用缓存")
     cache_ttl_seconds: int = Field(default=3600, description="缓存过期时间")
+    cache_max_entries: int = Field(default=1024, description="缓存条目上限")
+    stream_enabled: bool = Field(
+        default=False,
+        description="是否流式读取融合结果并在超出token预算时提前停止"
+    )
+    max_concurrency: int = Field(default=8, description="并发融合调用上限")
 
 
 class FusedMemory(BaseModel):
     """融合后的记忆"""
-    
+
+    # 融合结果只读，可安全缓存和跨请求共享
+    model_config = ConfigDict(frozen=True)
+
     content: str = Field(description="融合后的内容")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="元数据")
     source_units: List[str] = Field(default_factory=list, description="源记忆单元ID")
@@ -57,14 +85,30 @@ class MemoryFuser:
         self,
         config: FusionConfig,
         model_manager: ModelManager,
-        cost_tracker: Optional[Any] = None
+        cost_tracker: Optional[CostTracker] = None
     ):
         self.config = config
         self.model_manager = model_manager
-        self.cost_tracker = cost_tracker  # CostTracker module not available
+        self.cost_tracker = cost_tracker
         self.token_counter = TokenCounter()
-        self._cache: Dict[str, FusedMemory] = {}
+        # TTLCache在插入时淘汰过期/超额条目，长期运行时内存占用有界
+        self._cache: TTLCache[int, FusedMemory] = TTLCache(
+            maxsize=config.cache_max_entries,
+            ttl=config.cache_ttl_seconds
+        )
+        # 已渲染片段正文缓存：同一单元在重叠的batch分组间只格式化一次
+        self._fragment_cache: TTLCache[Tuple[str, int], str] = TTLCache(
+            maxsize=config.cache_max_entries,
+            ttl=config.cache_ttl_seconds
+        )
+        # 进行中的融合任务：并发的相同请求合并为一次模型调用
+        self._inflight: Dict[int, asyncio.Task[FusedMemory]] = {}
+        # 片段缓存可能被worker线程访问（见_perform_fusion的to_thread路径）
+        self._fragment_cache_lock = threading.Lock()
+        self._fusion_semaphore = asyncio.Semaphore(config.max_concurrency)
         self._prompt_template: Optional[str] = None
+        # 预解析后的模板：字面段+占位符名交错序列，填充时无需重新扫描模板
+        self._template_parts: List[Tuple[str, Optional[str]]] = []
         self._load_prompt_template()
         
         logger.info(
@@ -88,9 +132,22 @@ class MemoryFuser:
                     using_default=True
                 )
                 self._prompt_template = self._get_default_template()
+            self._compile_template(self._prompt_template)
         except Exception as e:
             logger.error("prompt_template_load_error", error=str(e))
             self._prompt_template = self._get_default_template()
+            self._compile_template(self._prompt_template)
+
+    def _compile_template(self, template: str) -> None:
+        """预解析模板为(字面段, 占位符名)序列
+
+        str.format每次调用都要重新扫描整个模板；
+        预解析后每次填充只需按序join，避免对多KB模板的重复扫描。
+        """
+        self._template_parts = [
+            (literal, field)
+            for literal, field, _spec, _conv in Formatter().parse(template)
+        ]
     
     def _get_default_template(self) -> str:
         """获取默认模板"""
@@ -153,28 +210,52 @@ class MemoryFuser:
             # 如果未启用融合，直接拼接
             return self._simple_concatenate(memory_units)
         
-        # 检查缓存
+        # 检查缓存（TTLCache在读取时自动跳过过期条目）
         cache_key = self._generate_cache_key(memory_units, query)
-        if self.config.cache_enabled and cache_key in self._cache:
-            cached = self._cache[cache_key]
-            if self._is_cache_valid(cached):
+        if self.config.cache_enabled:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
                 logger.info("fusion_cache_hit", key=cache_key)
                 return cached
         
-        # 执行融合
+        # 合并并发的相同请求：同一键在任意时刻只发起一次模型调用
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            logger.info("fusion_request_coalesced", key=cache_key)
+            return await asyncio.shield(inflight)
+
+        task = asyncio.ensure_future(
+            self._fuse_and_cache(memory_units, query, max_tokens, cache_key)
+        )
+        self._inflight[cache_key] = task
         try:
-            fused = await self._perform_fusion(
-                memory_units,
-                query,
-                max_tokens or self.config.token_limit
-            )
-            
+            return await task
+        finally:
+            self._inflight.pop(cache_key, None)
+
+    async def _fuse_and_cache(
+        self,
+        memory_units: List[MemoryUnitModel],
+        query: str,
+        max_tokens: Optional[int],
+        cache_key: int
+    ) -> FusedMemory:
+        """执行融合并写入缓存，失败时降级到简单拼接"""
+        # 信号量限制并发调用数，避免超出提供商QPM限制
+        try:
+            async with self._fusion_semaphore:
+                fused = await self._perform_fusion(
+                    memory_units,
+                    query,
+                    max_tokens or self.config.token_limit
+                )
+
             # 缓存结果
             if self.config.cache_enabled:
                 self._cache[cache_key] = fused
-            
+
             return fused
-            
+
         except Exception as e:
             logger.error("fusion_error", error=str(e))
             # 降级到简单拼接
@@ -187,16 +268,24 @@ class MemoryFuser:
         max_tokens: int
     ) -> FusedMemory:
         """执行融合操作"""
-        # 准备片段
-        fragments = self._prepare_fragments(memory_units)
-        
-        # 构建提示
-        prompt = self._build_fusion_prompt(fragments, query, max_tokens)
-        
+        # 构建提示；大批量时移到worker线程，避免阻塞事件循环上
+        # 其他并发融合协程的网络I/O（小批量直接内联，省去线程切换）
+        if len(memory_units) > 8:
+            prompt = await asyncio.to_thread(
+                self._build_prompt, memory_units, query, max_tokens
+            )
+        else:
+            prompt = self._build_prompt(memory_units, query, max_tokens)
+
         # 调用模型
         start_time = asyncio.get_event_loop().time()
-        
+
         try:
+            if self.config.stream_enabled:
+                return await self._perform_fusion_stream(
+                    memory_units, query, prompt, max_tokens, start_time
+                )
+
             response = await self.model_manager.generate_completion(
                 model=self.config.model,
                 messages=[{"role": "user", "content": prompt}],
@@ -210,6 +299,16 @@ class MemoryFuser:
             usage = response.usage if hasattr(response, 'usage') else {}
             cost = response.cost_usd if hasattr(response, 'cost_usd') else 0.0
             
+            # 记录成本（增量聚合）
+            if self.cost_tracker:
+                usage = usage or {}
+                self.cost_tracker.record_cost(
+                    model=self.config.model,
+                    cost=cost,
+                    input_tokens=usage.get("prompt_tokens", 0),
+                    output_tokens=usage.get("completion_tokens", 0)
+                )
+
             # 统计token
             token_count = self.token_counter.count_tokens(content)
             
@@ -245,23 +344,110 @@ class MemoryFuser:
             )
             raise
     
+    async def _perform_fusion_stream(
+        self,
+        memory_units: List[MemoryUnitModel],
+        query: str,
+        prompt: str,
+        max_tokens: int,
+        start_time: float
+    ) -> FusedMemory:
+        """流式执行融合，超出token预算时提前终止读取"""
+        parts: List[str] = []
+        token_count = 0
+        truncated = False
+
+        stream = self.model_manager.generate_completion_stream(
+            model=self.config.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.config.temperature,
+            max_tokens=max_tokens
+        )
+
+        try:
+            async for chunk in stream:
+                parts.append(chunk)
+                token_count += self.token_counter.count_tokens(chunk)
+                if token_count >= max_tokens:
+                    truncated = True
+                    break
+        finally:
+            await stream.aclose()
+
+        content = "".join(parts)
+        elapsed_time = asyncio.get_event_loop().time() - start_time
+
+        logger.info(
+            "fusion_completed",
+            model=self.config.model,
+            input_units=len(memory_units),
+            output_tokens=token_count,
+            truncated=truncated,
+            streamed=True,
+            elapsed_time=elapsed_time
+        )
+
+        return FusedMemory(
+            content=content,
+            metadata={
+                "query": query,
+                "fusion_time": elapsed_time,
+                "input_count": len(memory_units),
+                "streamed": True,
+                "truncated": truncated
+            },
+            source_units=[unit.id for unit in memory_units],
+            token_count=token_count,
+            fusion_model=self.config.model,
+            fusion_cost=0.0
+        )
+
+    def _build_prompt(
+        self,
+        memory_units: List[MemoryUnitModel],
+        query: str,
+        max_tokens: int
+    ) -> str:
+        """同步的提示构建：片段准备 + 模板填充"""
+        fragments = self._prepare_fragments(memory_units)
+        return self._build_fusion_prompt(fragments, query, max_tokens)
+
+    def _render_fragment_body(self, unit: MemoryUnitModel) -> str:
+        """渲染单个片段正文（带缓存）
+
+        正文不含片段编号，可在不同分组间复用；
+        键包含内容哈希，内容变化时自动失效。
+        """
+        cache_key = (unit.id, xxhash.xxh3_64_intdigest(unit.content.encode()))
+        with self._fragment_cache_lock:
+            body = self._fragment_cache.get(cache_key)
+        if body is None:
+            type_line = _TYPE_LINES.get(
+                unit.unit_type, f"Type: {unit.unit_type}\n"
+            )
+            body = (
+                f"Time: {unit.created_at}\n"
+                + type_line
+                + (
+                    f"Metadata: {dumps_json(unit.metadata)}\n"
+                    if unit.metadata else ""
+                )
+                + f"Content:\n{unit.content}\n"
+            )
+            with self._fragment_cache_lock:
+                self._fragment_cache[cache_key] = body
+        return body
+
     def _prepare_fragments(self, memory_units: List[MemoryUnitModel]) -> str:
         """准备记忆片段"""
+        # 每个片段一次性格式化后join，避免循环内+=拼接产生的中间字符串
         fragments = []
-        
         for i, unit in enumerate(memory_units):
-            fragment = f"<fragment_{i:02d}>\n"
-            fragment += f"Time: {unit.created_at}\n"
-            fragment += f"Type: {unit.unit_type}\n"
-            
-            if unit.metadata:
-                fragment += f"Metadata: {json.dumps(unit.metadata, ensure_ascii=False)}\n"
-            
-            fragment += f"Content:\n{unit.content}\n"
-            fragment += f"</fragment_{i:02d}>"
-            
-            fragments.append(fragment)
-        
+            open_tag, close_tag = _fragment_tags(i)
+            fragments.append(
+                f"{open_tag}\n{self._render_fragment_body(unit)}{close_tag}"
+            )
+
         return "\n\n".join(fragments)
     
     def _build_fusion_prompt(
@@ -271,17 +457,24 @@ class MemoryFuser:
         max_tokens: int
     ) -> str:
         """构建融合提示"""
-        if not self._prompt_template:
+        if not self._template_parts:
             self._load_prompt_template()
-        
-        prompt = self._prompt_template.format(
-            retrieved_passages=fragments,
-            query=query,
-            token_limit=max_tokens,
-            language=self.config.language
-        )
-        
-        return prompt
+
+        values = {
+            "retrieved_passages": fragments,
+            "query": query,
+            "token_limit": max_tokens,
+            "language": self.config.language
+        }
+
+        parts = []
+        for literal, field in self._template_parts:
+            if literal:
+                parts.append(literal)
+            if field is not None:
+                parts.append(str(values[field]))
+
+        return "".join(parts)
     
     def _simple_concatenate(self, memory_units: List[MemoryUnitModel]) -> FusedMemory:
         """简单拼接记忆单元"""
@@ -307,18 +500,17 @@ class MemoryFuser:
         self,
         memory_units: List[MemoryUnitModel],
         query: str
-    ) -> str:
+    ) -> int:
         """生成缓存键"""
-        # 使用记忆单元ID和查询生成唯一键
-        unit_ids = sorted([unit.id for unit in memory_units])
-        key_str = f"{query}:{':'.join(unit_ids)}"
-        return hashlib.sha256(key_str.encode()).hexdigest()[:16]
-    
-    def _is_cache_valid(self, cached: FusedMemory) -> bool:
-        """检查缓存是否有效"""
-        # 这里可以添加更复杂的缓存验证逻辑
-        # 比如检查时间戳、版本等
-        return True
+        # 使用记忆单元ID、内容和查询生成唯一键
+        # 缓存键无需抗碰撞安全性，xxh3比sha256快一个数量级；
+        # int键比十六进制字符串键更省内存且哈希更快
+        buf = bytearray(query.encode())
+        for unit in sorted(memory_units, key=lambda u: u.id):
+            buf += unit.id.encode()
+            buf += unit.content.encode()
+            buf += str(unit.relevance_score).encode()
+        return xxhash.xxh3_64_intdigest(buf)
     
     def clear_cache(self) -> None:
         """清空缓存"""
@@ -327,7 +519,7 @@ class MemoryFuser:
     
     async def batch_fuse(
         self,
-        memory_groups: List[Tuple[List[MemoryUnit], str]],
+        memory_groups: List[Tuple[List[MemoryUnitModel], str]],
         max_tokens: Optional[int] = None
     ) -> List[FusedMemory]:
         """
@@ -340,13 +532,19 @@ class MemoryFuser:
         Returns:
             融合结果列表
         """
+        # 组内去重：同一单元重复出现时只向模型发送一份，减少输入token
+        deduped_groups = [
+            (self._dedupe_units(units), query)
+            for units, query in memory_groups
+        ]
+
         tasks = [
             self.fuse_memories(units, query, max_tokens)
-            for units, query in memory_groups
+            for units, query in deduped_groups
         ]
-        
+
         results = await asyncio.gather(*tasks, return_exceptions=True)
-        
+
         # 处理异常
         fused_memories = []
         for i, result in enumerate(results):
@@ -357,18 +555,33 @@ class MemoryFuser:
                     error=str(result)
                 )
                 # 降级处理
-                units, query = memory_groups[i]
+                units, query = deduped_groups[i]
                 fused_memories.append(self._simple_concatenate(units))
             else:
                 fused_memories.append(result)
-        
+
         return fused_memories
+
+    @staticmethod
+    def _dedupe_units(
+        memory_units: List[MemoryUnitModel]
+    ) -> List[MemoryUnitModel]:
+        """按单元ID去重，保留首次出现的顺序"""
+        seen: set[str] = set()
+        unique = []
+        for unit in memory_units:
+            if unit.id not in seen:
+                seen.add(unit.id)
+                unique.append(unit)
+        return unique
     
     def get_stats(self) -> Dict[str, Any]:
         """获取统计信息"""
         return {
             "cache_size": len(self._cache),
-            "total_cost": self.cost_tracker.get_total_cost(),
+            "total_cost": (
+                self.cost_tracker.get_total_cost() if self.cost_tracker else 0.0
+            ),
             "model": self.config.model,
             "enabled": self.config.enabled
         }
\ No newline at end of file
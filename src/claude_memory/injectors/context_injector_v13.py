@@ -147,11 +147,22 @@ class ContextInjectorV13:
         
         try:
             # 1. 检索相关记忆
-            memory_units = await self._retrieve_memories(
-                request.query,
-                request.conversation_id,
-                request.strategy
-            )
+            # 如果稍后需要融合，则并行预热模型HTTP会话，让建连与检索重叠
+            if request.include_fused and self.settings.memory.fuser_enabled:
+                memory_units, _ = await asyncio.gather(
+                    self._retrieve_memories(
+                        request.query,
+                        request.conversation_id,
+                        request.strategy
+                    ),
+                    self._warmup_model_session()
+                )
+            else:
+                memory_units = await self._retrieve_memories(
+                    request.query,
+                    request.conversation_id,
+                    request.strategy
+                )
             
             if not memory_units:
                 logger.warning("no_memories_found", query=request.query)
@@ -229,6 +240,16 @@ class ContextInjectorV13:
             )
             raise
     
+    async def _warmup_model_session(self) -> None:
+        """预热模型HTTP会话
+
+        仅确保共享会话已创建，失败不影响注入主流程。
+        """
+        try:
+            await self.model_manager.initialize()
+        except Exception as e:
+            logger.debug("model_session_warmup_failed", error=str(e))
+
     async def _retrieve_memories(
         self,
         query: str,
@@ -5,7 +5,6 @@ Claude记忆管理MCP服务 - MCP服务器实现
 """
 
 import asyncio
-import json
 import logging
 import os
 import sys
@@ -41,6 +40,7 @@ from claude_memory.models.data_models import (
     HealthStatus,
 )
 from claude_memory.utils.error_handling import handle_exceptions
+from claude_memory.utils.serialization import dumps_json
 
 # 配置结构化日志 - 只写入文件，不干扰stdio
 import os
@@ -375,10 +375,10 @@ class ClaudeMemoryMCPServer:
             if not self.service_manager:
                 return [TextContent(
                     type="text",
-                    text=json.dumps({
+                    text=dumps_json({
                         "error": "Service not initialized",
                         "success": False
-                    }, ensure_ascii=False, indent=2)
+                    }, indent=True)
                 )]
             
             try:
@@ -400,21 +400,21 @@ class ClaudeMemoryMCPServer:
                 else:
                     return [TextContent(
                         type="text",
-                        text=json.dumps({
+                        text=dumps_json({
                             "error": f"Unknown tool: {name}",
                             "success": False
-                        }, ensure_ascii=False, indent=2)
+                        }, indent=True)
                     )]
                     
             except Exception as e:
                 logger.error(f"Tool {name} execution failed", error=str(e), arguments=arguments)
                 return [TextContent(
                     type="text",
-                    text=json.dumps({
+                    text=dumps_json({
                         "error": str(e),
                         "success": False,
                         "tool": name
-                    }, ensure_ascii=False, indent=2)
+                    }, indent=True)
                 )]
 
         @self.server.read_resource()
@@ -427,9 +427,9 @@ class ClaudeMemoryMCPServer:
                     status = await self.service_manager.get_service_status()
                     return status.json(ensure_ascii=False, indent=2)
                 else:
-                    return json.dumps({"error": "Service not initialized"}, ensure_ascii=False)
+                    return dumps_json({"error": "Service not initialized"})
             
-            return json.dumps({"error": f"Unknown resource: {uri_str}"}, ensure_ascii=False)
+            return dumps_json({"error": f"Unknown resource: {uri_str}"})
 
     async def _handle_search(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
         """
@@ -465,7 +465,7 @@ class ClaudeMemoryMCPServer:
                     # API返回的数据已经是格式化好的
                     return [TextContent(
                         type="text",
-                        text=json.dumps(response_data, ensure_ascii=False, indent=2)
+                        text=dumps_json(response_data, indent=True)
                     )]
                 else:
                     logger.warning(f"API Server returned {response.status_code}, falling back to ServiceManager")
@@ -512,16 +512,16 @@ class ClaudeMemoryMCPServer:
             
             return [TextContent(
                 type="text",
-                text=json.dumps(response_data, ensure_ascii=False, indent=2)
+                text=dumps_json(response_data, indent=True)
             )]
         
         # 如果都失败了
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=dumps_json({
                 "success": False,
                 "error": "Both API Server and ServiceManager are unavailable"
-            }, ensure_ascii=False, indent=2)
+            }, indent=True)
         )]
 
     async def _handle_inject(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
@@ -559,7 +559,7 @@ class ClaudeMemoryMCPServer:
                     response_data = response.json()
                     return [TextContent(
                         type="text",
-                        text=json.dumps(response_data, ensure_ascii=False, indent=2)
+                        text=dumps_json(response_data, indent=True)
                     )]
                 else:
                     logger.warning(f"API Server returned {response.status_code}, falling back to ServiceManager")
@@ -603,16 +603,16 @@ class ClaudeMemoryMCPServer:
             
             return [TextContent(
                 type="text",
-                text=json.dumps(response_data, ensure_ascii=False, indent=2)
+                text=dumps_json(response_data, indent=True)
             )]
         
         # 如果都失败了
         return [TextContent(
             type="text",
-            text=json.dumps({
+            text=dumps_json({
                 "success": False,
                 "error": "Both API Server and ServiceManager are unavailable"
-            }, ensure_ascii=False, indent=2)
+            }, indent=True)
         )]
 
     async def _handle_status(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
@@ -649,7 +649,7 @@ class ClaudeMemoryMCPServer:
         
         return [TextContent(
             type="text",
-            text=json.dumps(response_data, ensure_ascii=False, indent=2)
+            text=dumps_json(response_data, indent=True)
         )]
 
     async def _handle_health(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
@@ -719,7 +719,7 @@ class ClaudeMemoryMCPServer:
         
         return [TextContent(
             type="text",
-            text=json.dumps(response_data, ensure_ascii=False, indent=2)
+            text=dumps_json(response_data, indent=True)
         )]
 
     async def _handle_cross_project_search(self, arguments: Dict[str, Any]) -> Sequence[TextContent]:
@@ -774,7 +774,7 @@ class ClaudeMemoryMCPServer:
         
         return [TextContent(
             type="text",
-            text=json.dumps(response_data, ensure_ascii=False, indent=2)
+            text=dumps_json(response_data, indent=True)
         )]
 
 
@@ -11,6 +11,7 @@ import asyncio
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Set, Tuple
 
+import ahocorasick
 import structlog
 from pydantic import BaseModel, Field
 
@@ -84,6 +85,11 @@ class SemanticCompressorV13:
         
         # 缓存已处理的消息ID
         self._processed_message_ids: Set[str] = set()
+
+        # 预编译关键词自动机，多模式匹配只需单次线性扫描
+        self._keyword_automaton: Optional[ahocorasick.Automaton] = None
+        self._keyword_snapshot: Tuple[str, ...] = ()
+        self._rebuild_keyword_automaton()
         
         logger.info(
             "semantic_compressor_v13_initialized",
@@ -163,6 +169,26 @@ class SemanticCompressorV13:
         
         return result
     
+    def _rebuild_keyword_automaton(self) -> None:
+        """重建关键词自动机（仅在关键词列表变化时执行）"""
+        keywords = tuple(self.settings.memory.summary_auto_trigger_keywords)
+        if keywords == self._keyword_snapshot and self._keyword_automaton is not None:
+            return
+
+        if not keywords:
+            self._keyword_automaton = None
+            self._keyword_snapshot = keywords
+            return
+
+        automaton = ahocorasick.Automaton()
+        for keyword in keywords:
+            # 小写匹配，保留原始关键词用于上报
+            automaton.add_word(keyword.lower(), keyword)
+        automaton.make_automaton()
+
+        self._keyword_automaton = automaton
+        self._keyword_snapshot = keywords
+
     def _check_triggers(self, request: CompressionRequest) -> CompressionTrigger:
         """检查触发条件"""
         trigger = CompressionTrigger()
@@ -173,12 +199,16 @@ class SemanticCompressorV13:
                 trigger.manual_command = True
                 break
         
-        # 2. 检查关键词
-        all_content = " ".join(msg.content for msg in request.messages)
-        for keyword in self.settings.memory.summary_auto_trigger_keywords:
-            if keyword.lower() in all_content.lower():
+        # 2. 检查关键词（自动机对全文做单次扫描）
+        self._rebuild_keyword_automaton()
+        if self._keyword_automaton is not None:
+            all_content = " ".join(msg.content for msg in request.messages).lower()
+            matched: Set[str] = set()
+            for _, keyword in self._keyword_automaton.iter(all_content):
+                matched.add(keyword)
+            if matched:
                 trigger.keyword_match = True
-                trigger.matched_keywords.append(keyword)
+                trigger.matched_keywords = sorted(matched)
         
         # 3. 检查token阈值
         total_tokens = sum(
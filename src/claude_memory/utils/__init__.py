@@ -4,14 +4,15 @@ Claude记忆管理MCP服务 - 工具模块
 提供各种工具函数和辅助类。
 """
 
-# from .cost_tracker import CostTracker  # 已删除
+from .cost_tracker import CostTracker
 from .error_handling import ProcessingError, RetryableError
 from .model_manager import ModelManager, ModelResponse, EmbeddingResponse, RerankResponse
+from .serialization import dumps_json
 from .text_processing import TextProcessor
 from .token_counter import TokenCounter
 
 __all__ = [
-    # 'CostTracker',  # 已删除
+    'CostTracker',
     'ProcessingError',
     'RetryableError', 
     'ModelManager',
@@ -19,5 +20,6 @@ __all__ = [
     'EmbeddingResponse',
     'RerankResponse',
     'TextProcessor',
-    'TokenCounter'
+    'TokenCounter',
+    'dumps_json'
 ]
\ No newline at end of file
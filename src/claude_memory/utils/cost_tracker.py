@@ -0,0 +1,146 @@
+"""
+Claude记忆管理MCP服务 - 成本追踪器
+
+记录每次API调用成本，并以增量方式维护总额和每日聚合，
+使统计查询为O(1)而非遍历全部调用记录。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# 模型定价（美元/1K token），未知模型按0计
+MODEL_PRICING: Dict[str, Dict[str, float]] = {
+    "gemini-2.5-pro": {"input": 0.00125, "output": 0.005},
+    "gemini-2.5-flash": {"input": 0.000075, "output": 0.0003},
+    "deepseek/deepseek-chat-v3-0324": {"input": 0.00014, "output": 0.00028},
+    "deepseek-ai/DeepSeek-V2.5": {"input": 0.00014, "output": 0.00028},
+    "Qwen/Qwen3-Embedding-8B": {"input": 0.00001, "output": 0.0},
+    "Qwen/Qwen3-Reranker-8B": {"input": 0.00001, "output": 0.0},
+}
+
+
+class CostTracker:
+    """成本追踪器"""
+
+    def __init__(self):
+        # 运行中聚合值，record_cost时O(1)更新
+        self._total_cost: float = 0.0
+        self._session_cost: float = 0.0
+
+        # 按日聚合（键为YYYY-MM-DD）
+        self.daily_costs: Dict[str, float] = {}
+
+        # 单次调用明细（供报表按模型分布使用）
+        self.session_costs: List[Dict[str, Any]] = []
+
+    def calculate_cost(
+        self,
+        model: str,
+        input_tokens: int,
+        output_tokens: int
+    ) -> float:
+        """
+        计算单次调用成本
+
+        Args:
+            model: 模型名称
+            input_tokens: 输入token数
+            output_tokens: 输出token数
+
+        Returns:
+            成本（美元）
+        """
+        pricing = MODEL_PRICING.get(model)
+        if not pricing:
+            return 0.0
+
+        return (
+            input_tokens / 1000 * pricing["input"]
+            + output_tokens / 1000 * pricing["output"]
+        )
+
+    def record_cost(
+        self,
+        model: str,
+        cost: float,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        记录一次调用成本并增量更新聚合值
+
+        Args:
+            model: 模型名称
+            cost: 调用成本（美元）
+            input_tokens: 输入token数
+            output_tokens: 输出token数
+            metadata: 其他元数据
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        self._total_cost += cost
+        self._session_cost += cost
+        self.daily_costs[today] = self.daily_costs.get(today, 0.0) + cost
+
+        self.session_costs.append({
+            "timestamp": datetime.now().isoformat(),
+            "model": model,
+            "cost": cost,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "metadata": metadata or {}
+        })
+
+    def track_usage(
+        self,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> float:
+        """计算并记录一次调用，返回成本"""
+        cost = self.calculate_cost(model, input_tokens, output_tokens)
+        self.record_cost(model, cost, input_tokens, output_tokens, metadata)
+        return cost
+
+    def get_total_cost(self) -> float:
+        """获取累计总成本（O(1)）"""
+        return self._total_cost
+
+    def get_session_cost(self) -> float:
+        """获取当前会话成本（O(1)）"""
+        return self._session_cost
+
+    def reset_session_cost(self) -> None:
+        """重置会话成本计数"""
+        self._session_cost = 0.0
+
+    def get_daily_cost(self, day: Optional[str] = None) -> float:
+        """获取指定日期（默认今日）的成本（O(1)）"""
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        return self.daily_costs.get(day, 0.0)
+
+    def get_daily_estimate(self) -> float:
+        """根据今日已产生成本估算全天成本"""
+        daily_cost = self.get_daily_cost()
+        hour = datetime.now().hour
+        if hour == 0:
+            return daily_cost * 24
+        return daily_cost / (hour + 1) * 24
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息（常量时间，不遍历调用明细）"""
+        return {
+            "total_cost": self._total_cost,
+            "session_cost": self._session_cost,
+            "daily_cost": self.get_daily_cost(),
+            "daily_cost_estimate": self.get_daily_estimate(),
+            "recorded_calls": len(self.session_costs)
+        }
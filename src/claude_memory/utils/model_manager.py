@@ -13,7 +13,7 @@ from __future__ import annotations
 
 import asyncio
 import json
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
 import aiohttp
 import structlog
@@ -62,11 +62,25 @@ class RerankResponse(BaseModel):
 class ModelManager:
     """统一模型管理器"""
     
-    def __init__(self, cost_tracker: Optional[Any] = None):
+    def __init__(
+        self,
+        cost_tracker: Optional[Any] = None,
+        max_connections: Optional[int] = None,
+        max_connections_per_host: Optional[int] = None
+    ):
         self.settings = get_settings()
         # self.cost_tracker = cost_tracker or CostTracker()  # 已删除成本追踪
         self.session: Optional[aiohttp.ClientSession] = None
         self._session_lock = asyncio.Lock()  # 添加锁以防止并发创建会话
+
+        # 连接池大小（默认取性能配置，调用方可覆盖）
+        self.max_connections = (
+            max_connections or self.settings.performance.http_max_connections
+        )
+        self.max_connections_per_host = (
+            max_connections_per_host
+            or self.settings.performance.http_max_connections_per_host
+        )
         
         # API配置
         self.providers = {
@@ -137,8 +151,8 @@ class ModelManager:
                 # 双重检查，防止多个协程同时等待锁
                 if self.session is None:
                     connector = aiohttp.TCPConnector(
-                        limit=100,
-                        limit_per_host=20,
+                        limit=self.max_connections,
+                        limit_per_host=self.max_connections_per_host,
                         ttl_dns_cache=300,
                         use_dns_cache=True
                     )
@@ -199,6 +213,86 @@ class ModelManager:
         else:
             raise ProcessingError(f"Unsupported provider: {provider}")
     
+    async def generate_completion_stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """流式生成文本补全，逐块产出内容
+
+        调用方可以在达到token预算后提前停止迭代，
+        避免等待（和计费）完整响应。
+        """
+        provider = self._get_provider(model)
+
+        if provider == 'siliconflow':
+            async for chunk in self._stream_siliconflow_completion(
+                model, messages, temperature, max_tokens, **kwargs
+            ):
+                yield chunk
+        else:
+            # 其他提供商暂不支持流式，退化为单块产出
+            response = await self.generate_completion(
+                model, messages, temperature, max_tokens, **kwargs
+            )
+            yield response.content
+
+    async def _stream_siliconflow_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """流式调用SiliconFlow聊天API（SSE）"""
+
+        url = f"{self.providers['siliconflow']['base_url']}/chat/completions"
+        headers = {
+            'Authorization': f"Bearer {self.providers['siliconflow']['api_key']}",
+            'Content-Type': 'application/json'
+        }
+
+        payload = {
+            'model': model,
+            'messages': messages,
+            'temperature': temperature,
+            'stream': True
+        }
+
+        if max_tokens:
+            payload['max_tokens'] = max_tokens
+
+        try:
+            session = await self._get_session()
+            async with session.post(url, headers=headers, json=payload) as response:
+                response.raise_for_status()
+
+                async for raw_line in response.content:
+                    line = raw_line.decode('utf-8').strip()
+                    if not line.startswith('data:'):
+                        continue
+
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        break
+
+                    chunk = json.loads(data)
+                    delta = chunk['choices'][0].get('delta', {}).get('content')
+                    if delta:
+                        yield delta
+
+        except Exception as e:
+            logger.error(
+                "SiliconFlow streaming completion failed",
+                model=model,
+                error=str(e)
+            )
+            raise ProcessingError(f"SiliconFlow streaming completion failed: {str(e)}")
+
     async def generate_embedding(
         self,
         model: str,
@@ -0,0 +1,30 @@
+"""
+JSON序列化工具
+
+基于orjson（Rust实现），比标准库json.dumps快数倍，
+默认即输出非ASCII字符，原生支持datetime。
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+
+
+def dumps_json(data: Any, indent: bool = False) -> str:
+    """
+    将对象序列化为JSON字符串
+
+    Args:
+        data: 要序列化的对象
+        indent: 是否以2空格缩进输出（用于人类可读的响应）
+
+    Returns:
+        JSON字符串（非ASCII字符原样输出）
+    """
+    option = orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+
+    return orjson.dumps(data, default=str, option=option).decode("utf-8")
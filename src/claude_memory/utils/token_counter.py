@@ -2,40 +2,74 @@
 Token计数器工具
 """
 
+import functools
+import os
+from typing import List, Optional
+
 import tiktoken
 
 
+@functools.lru_cache(maxsize=8)
+def _get_encoding(model: str) -> Optional[tiktoken.Encoding]:
+    """获取并缓存tiktoken编码器，所有计数器实例共享同一实例"""
+    try:
+        return tiktoken.get_encoding(model)
+    except Exception:
+        # 如果tiktoken不可用，使用简单估算
+        return None
+
+
 class TokenCounter:
     """Token计数器"""
-    
+
     def __init__(self, model: str = "cl100k_base"):
         """
         初始化
-        
+
         Args:
             model: tiktoken编码模型名称
         """
-        try:
-            self.encoding = tiktoken.get_encoding(model)
-        except:
-            # 如果tiktoken不可用，使用简单估算
-            self.encoding = None
-    
+        self.encoding = _get_encoding(model)
+
     def count_tokens(self, text: str) -> int:
         """
         计算文本的token数
-        
+
         Args:
             text: 要计算的文本
-            
+
         Returns:
             token数量
         """
         if not text:
             return 0
-        
+
         if self.encoding:
             return len(self.encoding.encode(text))
         else:
             # 简单估算：平均每4个字符一个token
-            return len(text) // 4 + 1
\ No newline at end of file
+            return len(text) // 4 + 1
+
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """
+        批量计算多段文本的token数
+
+        使用tiktoken的线程并行批量接口，比逐条encode快得多。
+
+        Args:
+            texts: 要计算的文本列表
+
+        Returns:
+            与texts等长的token数量列表
+        """
+        if not texts:
+            return []
+
+        if self.encoding:
+            encoded = self.encoding.encode_ordinary_batch(
+                texts,
+                num_threads=os.cpu_count() or 1
+            )
+            return [len(tokens) for tokens in encoded]
+        else:
+            return [len(text) // 4 + 1 if text else 0 for text in texts]
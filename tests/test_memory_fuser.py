@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+MemoryFuser 单元测试
+
+覆盖融合、缓存和批量并发路径，不依赖外部服务。
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+from pydantic import ValidationError
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from claude_memory.fusers.memory_fuser import (
+    FusedMemory,
+    FusionConfig,
+    MemoryFuser,
+)
+from claude_memory.models.data_models import MemoryUnitModel, MemoryUnitType
+from claude_memory.utils.cost_tracker import CostTracker
+from claude_memory.utils.model_manager import ModelManager, ModelResponse
+
+
+@pytest.fixture(scope="module")
+def fusion_config():
+    """融合配置（frozen模型，模块级共享；需要变体的测试用model_copy）"""
+    return FusionConfig(
+        enabled=True,
+        model="gemini-2.5-flash",
+        prompt_template_path="./prompts/nonexistent_template.md",
+        cache_enabled=True,
+    )
+
+
+@pytest.fixture
+def mock_model_manager():
+    """模拟模型管理器"""
+    manager = AsyncMock(spec=ModelManager)
+    manager.generate_completion.return_value = ModelResponse(
+        content="融合后的上下文内容",
+        usage={"prompt_tokens": 100, "completion_tokens": 50},
+        model="gemini-2.5-flash",
+        provider="gemini",
+        cost_usd=0.001,
+    )
+    return manager
+
+
+@pytest.fixture(scope="module")
+def sample_memory_units():
+    """测试用记忆单元（测试内不可就地修改，变体用model_copy）"""
+    units = []
+    for i, unit_type in enumerate([
+        MemoryUnitType.DECISION,
+        MemoryUnitType.ERROR_LOG,
+        MemoryUnitType.CODE_SNIPPET,
+    ]):
+        units.append(MemoryUnitModel(
+            memory_id=f"mem_{i:03d}",
+            conversation_id="conv_001",
+            unit_type=unit_type,
+            title=f"记忆单元{i}",
+            summary=f"摘要{i}",
+            content=f"记忆内容{i}：关于{unit_type.value}的记录",
+            relevance_score=0.9 - i * 0.1,
+        ))
+    return units
+
+
+@pytest.fixture
+def fuser(fusion_config, mock_model_manager):
+    """记忆融合器"""
+    return MemoryFuser(config=fusion_config, model_manager=mock_model_manager)
+
+
+async def test_fuse_memories_enabled(fuser, sample_memory_units):
+    """测试启用融合时调用模型"""
+    result = await fuser.fuse_memories(sample_memory_units, "测试查询")
+
+    assert isinstance(result, FusedMemory)
+    assert result.content == "融合后的上下文内容"
+    assert result.fusion_model == "gemini-2.5-flash"
+    assert result.source_units == [unit.id for unit in sample_memory_units]
+    fuser.model_manager.generate_completion.assert_called_once()
+
+
+async def test_fuse_memories_disabled(
+    fusion_config, mock_model_manager, sample_memory_units
+):
+    """测试禁用融合时降级为简单拼接"""
+    fusion_config = fusion_config.model_copy(update={"enabled": False})
+    fuser = MemoryFuser(config=fusion_config, model_manager=mock_model_manager)
+
+    result = await fuser.fuse_memories(sample_memory_units, "测试查询")
+
+    assert result.fusion_model == "none"
+    assert result.fusion_cost == 0.0
+    mock_model_manager.generate_completion.assert_not_called()
+
+
+async def test_batch_fuse(fuser, sample_memory_units):
+    """测试批量融合并发执行多组"""
+    in_flight = 0
+    max_in_flight = 0
+
+    async def tracked_completion(**kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return ModelResponse(
+            content="融合结果",
+            model="gemini-2.5-flash",
+            provider="gemini",
+        )
+
+    fuser.model_manager.generate_completion.side_effect = tracked_completion
+
+    groups = [
+        (sample_memory_units[:2], "查询1"),
+        (sample_memory_units[1:], "查询2"),
+        (sample_memory_units, "查询3"),
+    ]
+    results = await fuser.batch_fuse(groups)
+
+    assert len(results) == 3
+    assert fuser.model_manager.generate_completion.call_count == 3
+    # 三组应重叠执行而非串行
+    assert max_in_flight > 1
+
+
+async def test_batch_fuse_with_error(fuser, sample_memory_units):
+    """测试批量融合中单组失败时降级"""
+    ok_response = ModelResponse(
+        content="融合结果",
+        model="gemini-2.5-flash",
+        provider="gemini",
+    )
+    fuser.model_manager.generate_completion.side_effect = [
+        ok_response,
+        RuntimeError("模型调用失败"),
+        ok_response,
+    ]
+
+    groups = [
+        (sample_memory_units[:1], "查询1"),
+        (sample_memory_units[1:2], "查询2"),
+        (sample_memory_units[2:], "查询3"),
+    ]
+    results = await fuser.batch_fuse(groups)
+
+    assert len(results) == 3
+    assert results[0].fusion_model == "gemini-2.5-flash"
+    # 失败组降级为简单拼接
+    assert results[1].fusion_model == "none"
+    assert results[2].fusion_model == "gemini-2.5-flash"
+
+
+def test_prepare_fragments(fuser, sample_memory_units):
+    """测试片段格式化输出"""
+    fragments = fuser._prepare_fragments(sample_memory_units)
+
+    assert "<fragment_00>" in fragments
+    assert "</fragment_00>" in fragments
+    assert "<fragment_02>" in fragments
+    assert "Type: decision" in fragments
+    assert "记忆内容0" in fragments
+
+
+async def test_fuse_memories_large_batch_offloaded(fuser, sample_memory_units):
+    """测试大批量单元走线程卸载路径时结果一致"""
+    many_units = [
+        unit.model_copy(update={"memory_id": f"mem_{i:03d}", "content": f"内容{i}"})
+        for i in range(12)
+        for unit in [sample_memory_units[i % len(sample_memory_units)]]
+    ]
+
+    result = await fuser.fuse_memories(many_units, "测试查询")
+
+    assert result.content == "融合后的上下文内容"
+    assert len(result.source_units) == 12
+    fuser.model_manager.generate_completion.assert_called_once()
+
+
+async def test_streamed_fusion_stops_at_token_limit(
+    fusion_config, mock_model_manager, sample_memory_units
+):
+    """测试流式融合在达到token预算时提前停止读取"""
+    fusion_config = fusion_config.model_copy(update={"stream_enabled": True})
+    fuser = MemoryFuser(config=fusion_config, model_manager=mock_model_manager)
+
+    consumed = 0
+
+    async def fake_stream(**kwargs):
+        nonlocal consumed
+        for _ in range(100):
+            consumed += 1
+            yield "chunk content here "
+
+    mock_model_manager.generate_completion_stream = fake_stream
+
+    result = await fuser.fuse_memories(sample_memory_units, "测试查询", max_tokens=10)
+
+    assert result.metadata["streamed"] is True
+    assert result.metadata["truncated"] is True
+    assert result.token_count >= 10
+    # 未消费完整个流
+    assert consumed < 100
+    mock_model_manager.generate_completion.assert_not_called()
+
+
+async def test_get_stats(fusion_config, mock_model_manager, sample_memory_units):
+    """测试统计信息包含增量聚合的成本"""
+    tracker = CostTracker()
+    fuser = MemoryFuser(
+        config=fusion_config,
+        model_manager=mock_model_manager,
+        cost_tracker=tracker,
+    )
+
+    await fuser.fuse_memories(sample_memory_units, "测试查询")
+
+    stats = fuser.get_stats()
+    assert stats["total_cost"] == pytest.approx(0.001)
+    assert stats["cache_size"] == 1
+
+    # 追踪器自身的统计为常量时间聚合
+    tracker_stats = tracker.get_stats()
+    assert tracker_stats["total_cost"] == pytest.approx(0.001)
+    assert tracker_stats["recorded_calls"] == 1
+
+
+def test_cost_tracker_incremental_totals():
+    """测试成本追踪器的O(1)增量聚合"""
+    tracker = CostTracker()
+
+    for _ in range(10):
+        cost = tracker.calculate_cost("gemini-2.5-flash", 1000, 1000)
+        tracker.record_cost("gemini-2.5-flash", cost, 1000, 1000)
+
+    expected = 10 * (0.000075 + 0.0003)
+    assert tracker.get_total_cost() == pytest.approx(expected)
+    assert tracker.get_session_cost() == pytest.approx(expected)
+    assert tracker.get_daily_cost() == pytest.approx(expected)
+
+    tracker.reset_session_cost()
+    assert tracker.get_session_cost() == 0.0
+    assert tracker.get_total_cost() == pytest.approx(expected)
+
+
+def test_load_default_template(fuser):
+    """测试模板缺失时回退到默认模板并预解析"""
+    assert fuser._prompt_template is not None
+    assert fuser._template_parts
+
+    fields = {field for _, field in fuser._template_parts if field}
+    assert "retrieved_passages" in fields
+    assert "token_limit" in fields
+
+
+async def test_build_fusion_prompt_fills_placeholders(fuser, sample_memory_units):
+    """测试提示填充包含片段与约束"""
+    await fuser.fuse_memories(sample_memory_units, "测试查询", max_tokens=500)
+
+    call_kwargs = fuser.model_manager.generate_completion.call_args.kwargs
+    prompt = call_kwargs["messages"][0]["content"]
+    assert "<fragment_00>" in prompt
+    assert "500" in prompt
+    assert "zh" in prompt
+
+
+def test_invalid_temperature():
+    """测试温度超出范围时校验失败"""
+    with pytest.raises(ValidationError):
+        FusionConfig(temperature=1.5)
+
+    with pytest.raises(ValidationError):
+        FusionConfig(temperature=-0.1)
+
+
+def test_config_frozen(fusion_config):
+    """测试配置不可变"""
+    with pytest.raises(ValidationError):
+        fusion_config.enabled = False
+
+
+def test_fragment_body_cache(fuser, sample_memory_units):
+    """测试片段正文跨分组复用与内容变化失效"""
+    first = fuser._prepare_fragments(sample_memory_units)
+    assert len(fuser._fragment_cache) == len(sample_memory_units)
+
+    # 相同单元再次渲染命中缓存，结果一致
+    second = fuser._prepare_fragments(sample_memory_units)
+    assert first == second
+
+    # 内容变化后缓存键失效，重新渲染
+    updated = sample_memory_units[0].model_copy(update={"content": "更新后的内容"})
+    fragments = fuser._prepare_fragments([updated])
+    assert "更新后的内容" in fragments
+
+
+async def test_cache_functionality(fuser, sample_memory_units):
+    """测试相同输入第二次调用命中缓存"""
+    result1 = await fuser.fuse_memories(sample_memory_units, "测试查询")
+    result2 = await fuser.fuse_memories(sample_memory_units, "测试查询")
+
+    assert result1.content == result2.content
+    # 第二次调用走缓存，模型只调用一次
+    fuser.model_manager.generate_completion.assert_called_once()
+    assert len(fuser._cache) == 1
+
+
+async def test_cache_bounded_by_max_entries(
+    fusion_config, mock_model_manager, sample_memory_units
+):
+    """测试缓存条目数不超过上限"""
+    fusion_config = fusion_config.model_copy(update={"cache_max_entries": 2})
+    fuser = MemoryFuser(config=fusion_config, model_manager=mock_model_manager)
+
+    for i in range(5):
+        await fuser.fuse_memories(sample_memory_units, f"查询{i}")
+
+    assert len(fuser._cache) <= 2
+
+
+async def test_clear_cache(fuser, sample_memory_units):
+    """测试清空缓存"""
+    await fuser.fuse_memories(sample_memory_units, "测试查询")
+    assert len(fuser._cache) == 1
+
+    fuser.clear_cache()
+    assert len(fuser._cache) == 0
+
+
+def test_cache_key_generation(fuser, sample_memory_units):
+    """测试缓存键生成的唯一性和稳定性"""
+    key1 = fuser._generate_cache_key(sample_memory_units, "查询A")
+    key2 = fuser._generate_cache_key(sample_memory_units, "查询B")
+    key3 = fuser._generate_cache_key(sample_memory_units[:2], "查询A")
+    key4 = fuser._generate_cache_key(sample_memory_units, "查询A")
+
+    # 不同查询/不同单元集合生成不同键，相同输入生成相同键
+    assert key1 != key2
+    assert key1 != key3
+    assert key1 == key4
+
+
+async def test_concurrent_identical_requests_coalesced(fuser, sample_memory_units):
+    """测试并发的相同融合请求合并为一次模型调用"""
+
+    async def slow_completion(**kwargs):
+        await asyncio.sleep(0.02)
+        return ModelResponse(
+            content="融合结果",
+            model="gemini-2.5-flash",
+            provider="gemini",
+        )
+
+    fuser.model_manager.generate_completion.side_effect = slow_completion
+
+    results = await asyncio.gather(*[
+        fuser.fuse_memories(sample_memory_units, "相同查询")
+        for _ in range(5)
+    ])
+
+    assert all(r.content == "融合结果" for r in results)
+    # 五个并发请求共享一次模型调用
+    fuser.model_manager.generate_completion.assert_called_once()
+    # 完成后不残留进行中任务
+    assert not fuser._inflight
+
+
+async def test_batch_fuse_dedupes_units_within_group(fuser, sample_memory_units):
+    """测试同组内重复单元只发送一份"""
+    duplicated = [
+        sample_memory_units[0],
+        sample_memory_units[1],
+        sample_memory_units[0],  # 重复
+    ]
+
+    await fuser.batch_fuse([(duplicated, "测试查询")])
+
+    call_kwargs = fuser.model_manager.generate_completion.call_args.kwargs
+    prompt = call_kwargs["messages"][0]["content"]
+    # 去重后只有两个片段
+    assert "<fragment_01>" in prompt
+    assert "<fragment_02>" not in prompt
+
+
+async def test_max_concurrency_limit(
+    fusion_config, mock_model_manager, sample_memory_units
+):
+    """测试并发上限不超过max_concurrency"""
+    fusion_config = fusion_config.model_copy(update={"max_concurrency": 2})
+    fuser = MemoryFuser(config=fusion_config, model_manager=mock_model_manager)
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def tracked_completion(**kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return ModelResponse(
+            content="融合结果",
+            model="gemini-2.5-flash",
+            provider="gemini",
+        )
+
+    mock_model_manager.generate_completion.side_effect = tracked_completion
+
+    groups = [
+        (sample_memory_units, f"查询{i}")
+        for i in range(6)
+    ]
+    # 每组查询不同，绕过缓存
+    results = await fuser.batch_fuse(groups)
+
+    assert len(results) == 6
+    assert max_in_flight <= 2